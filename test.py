@@ -1,7 +1,11 @@
+import functools
+import hashlib
 import os
 import sys
+import tempfile
 import time
 import traceback
+import zipfile
 
 import numpy
 import potrace as potracelib  # pypotrace library
@@ -9,6 +13,11 @@ import pyautogui
 from PIL import Image, UnidentifiedImageError
 from skimage.morphology import skeletonize
 
+try:
+    import numba  # Optional: JIT-compiles the per-curve geometry step when installed.
+except ImportError:
+    numba = None
+
 # This script converts an image into a series of mouse drawing
 # actions using PyAutoGUI. It leverages the Potrace library 
 # to vectorize the image by tracing outlines. The resulting vector paths are then
@@ -27,70 +36,400 @@ POTRACE_ALPHAMAX = 1.0     # Potrace corner detection threshold. Default: 1.0.
                            # Range: 0.0 (polygons only) to 1.3333 (no corners, very smooth).
 
 # Tessellation Settings (how Potrace curves are broken into straight lines for PyAutoGUI)
-TESSELATE_METHOD = 'adaptive' # Options: 'adaptive' or 'regular'.
+TESSELATE_METHOD = 'adaptive' # Options: 'adaptive', 'regular' or 'afd'.
                             # 'adaptive' intelligently adds more points where curves are sharper.
                             # 'regular' divides curves into a fixed number of segments.
+                            # 'afd' uses adaptive forward differencing on the curve segments (fast with numba).
 TESSELATE_RES = 15          # Resolution for 'regular' tessellation. Higher = smoother curves but more points/slower.
                             # This setting is generally ignored by the 'adaptive' method.
+AFD_FLATNESS = 0.25         # Flatness tolerance (pixels) for 'afd'. Lower = more points, closer to the true curve.
+SIMPLIFY_EPSILON_PX = 0.5   # Ramer-Douglas-Peucker tolerance (screen pixels) used to drop near-collinear points
+                            # before drawing. On by default, so drawings have fewer points; 0 disables simplification.
 
 # Drawing Control
-PYAUTOGUI_ACTION_PAUSE = 0.005 # Pause (seconds) between individual PyAutoGUI actions.
+PYAUTOGUI_ACTION_PAUSE = 0.005 # Pause (seconds) after each stroke's PyAutoGUI actions (moves within a stroke don't pause).
 START_DRAW_DELAY = 5         # Seconds to wait before drawing starts, allowing time to switch windows.
 SCALE_FACTOR = 0.6           # Scale of the final drawing. 1.0 = original image size, 0.5 = half, 2.0 = double.
+REORDER_CURVES = True        # If True, draws curves in nearest-neighbour order, entering each closed curve at its
+                             # vertex nearest the pen (open ones may be reversed), to cut pen travel.
 
 # Border Skipping Heuristic
 ATTEMPT_TO_SKIP_IMAGE_BORDER = True # If True, tries to detect and skip drawing paths that form a full-image border.
 BORDER_DETECTION_PIXEL_TOLERANCE = 5 # Max distance (pixels) from image edge for a path to be considered part of a border.
 BORDER_DETECTION_DIMENSION_MATCH_RATIO = 0.95 # Path width/height must be at least this ratio of image width/height
                                              # to be considered part of a border.
+
+# Performance
+USE_NUMBA = True # If True and numba is installed, JIT-compiles the numeric helpers: border detection and
+                 # redundant-point filtering (run across curves in parallel), RDP simplification and 'afd' tessellation.
+                 # Falls back to the pure-NumPy/Python implementations otherwise.
+
+# Caching
+TRACE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'img-to-drawing')
+                 # Traced images are cached here, keyed by image path, modification time and trace settings.
+                 # Re-running on the same image skips tracing. None disables the on-disk cache.
 # --- End Configuration ---
 
-def image_to_pyautogui_actions(
-    image_path, threshold, turd_size, opt_tolerance, alphamax, scale_factor,
+TRACE_CACHE_VERSION = 2 # Bump when the cached trace format or tracing logic changes.
+
+# Raw action type codes, stored as uint8 alongside the coordinates; ACTION_NAMES[code] is the name
+# used in the final action list.
+ACTION_MOVETO = 0
+ACTION_DRAGTO = 1
+ACTION_NAMES = numpy.array(['moveto', 'dragto'])
+
+def _is_border_bbox(mins, maxs, border_thresh, border_pixel_tol, hi_edge):
+    """
+    Applies the image border heuristic to bounding boxes.
+
+    Args:
+        mins (numpy.ndarray): (..., 2) per-axis minima of each bounding box.
+        maxs (numpy.ndarray): (..., 2) per-axis maxima of each bounding box.
+        border_thresh, border_pixel_tol, hi_edge: As in _process_curves_numpy.
+
+    Returns:
+        numpy.ndarray: (...) boolean, True where the bounding box looks like an image border.
+    """
+    # Each predicate is evaluated for (x, y) at once.
+    spans_almost_full = ((maxs - mins) >= border_thresh).all(axis=-1)
+    is_near_low_edges = (mins <= border_pixel_tol).all(axis=-1)   # Left and top edges.
+    is_near_high_edges = (maxs >= hi_edge).all(axis=-1)           # Right and bottom edges.
+    return spans_almost_full & is_near_low_edges & is_near_high_edges
+
+def _process_curves_numpy(all_coords, offsets, check_border, border_thresh, border_pixel_tol, hi_edge, eps):
+    """
+    Runs border detection and redundant-point filtering on every curve at once (pure NumPy).
+
+    Args:
+        all_coords (numpy.ndarray): (M, 2) float32 array, every curve's start point followed by its
+            tessellated vertices, curves stored back to back.
+        offsets (numpy.ndarray): Curve i occupies rows offsets[i]:offsets[i + 1] of all_coords.
+        check_border (bool): Whether to test the curves against the image border heuristic.
+        border_thresh (numpy.ndarray): Minimum (width, height) for a curve to be considered a border.
+        border_pixel_tol (float): Pixel tolerance for the left/top edges.
+        hi_edge (numpy.ndarray): (x, y) a border curve's maxima must reach (right/bottom edges).
+        eps (float): Points moving less than this from their predecessor on both axes are dropped.
+
+    Returns:
+        tuple: (keep, is_border); a per-point boolean mask of points to draw and a per-curve border flag.
+    """
+    starts = offsets[:-1]
+
+    if check_border:
+        # Per-axis extrema of every curve, computed in two vectorized passes.
+        curve_mins = numpy.minimum.reduceat(all_coords, starts, axis=0)
+        curve_maxs = numpy.maximum.reduceat(all_coords, starts, axis=0)
+        is_border = _is_border_bbox(curve_mins, curve_maxs, border_thresh, border_pixel_tol, hi_edge)
+    else:
+        is_border = numpy.zeros(starts.shape[0], dtype=numpy.bool_)
+
+    # Avoid tiny redundant moves if tessellation produces very close points.
+    keep = numpy.empty(all_coords.shape[0], dtype=numpy.bool_)
+    keep[1:] = numpy.abs(numpy.diff(all_coords, axis=0)).max(axis=1) > eps
+    keep[starts] = True # Each curve's start point is always kept (it becomes the 'moveto').
+    return keep, is_border
+
+def _process_curves_loops(all_coords, offsets, check_border, border_thresh, border_pixel_tol, hi_edge, eps):
+    """Same as _process_curves_numpy, written as explicit loops so numba can compile it and run curves in parallel."""
+    n_curves = offsets.shape[0] - 1
+    keep = numpy.empty(all_coords.shape[0], dtype=numpy.bool_)
+    is_border = numpy.zeros(n_curves, dtype=numpy.bool_)
+
+    # Same predicate as _is_border_bbox, written out on scalars for numba.
+    # Border thresholds are the same for every curve; read them out of the arrays once.
+    min_width_for_border = border_thresh[0]
+    min_height_for_border = border_thresh[1]
+    right_edge = hi_edge[0]
+    bottom_edge = hi_edge[1]
+
+    for c in prange(n_curves):
+        start = offsets[c]
+        stop = offsets[c + 1]
+
+        if check_border:
+            min_x = max_x = all_coords[start, 0]
+            min_y = max_y = all_coords[start, 1]
+            for i in range(start + 1, stop):
+                x = all_coords[i, 0]
+                y = all_coords[i, 1]
+                if x < min_x:
+                    min_x = x
+                elif x > max_x:
+                    max_x = x
+                if y < min_y:
+                    min_y = y
+                elif y > max_y:
+                    max_y = y
+
+            is_border[c] = (max_x - min_x >= min_width_for_border and max_y - min_y >= min_height_for_border and
+                            min_x <= border_pixel_tol and min_y <= border_pixel_tol and
+                            max_x >= right_edge and max_y >= bottom_edge)
+
+        keep[start] = True
+        for i in range(start + 1, stop):
+            keep[i] = (abs(all_coords[i, 0] - all_coords[i - 1, 0]) > eps or
+                       abs(all_coords[i, 1] - all_coords[i - 1, 1]) > eps)
+    return keep, is_border
+
+def _rdp_mask_numpy(points, epsilon):
+    """
+    Ramer-Douglas-Peucker simplification of one polyline (NumPy distances, iterative stack).
+
+    Args:
+        points (numpy.ndarray): (N, 2) polyline vertices.
+        epsilon (float): Vertices closer than this to the simplified polyline are dropped.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the vertices to keep; the endpoints are always kept.
+    """
+    n = points.shape[0]
+    keep = numpy.zeros(n, dtype=numpy.bool_)
+    keep[0] = keep[n - 1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a = points[first].astype(numpy.float64)
+        d = points[last] - a
+        rel = points[first + 1:last] - a
+        seg_len = numpy.hypot(d[0], d[1])
+        if seg_len > 0:
+            dists = numpy.abs(d[0] * rel[:, 1] - d[1] * rel[:, 0]) / seg_len
+        else: # Closed curve: the segment is a point, use the distance to it.
+            dists = numpy.hypot(rel[:, 0], rel[:, 1])
+        idx = int(dists.argmax())
+        if dists[idx] > epsilon:
+            idx += first + 1
+            keep[idx] = True
+            stack.append((first, idx))
+            stack.append((idx, last))
+    return keep
+
+def _rdp_mask_loops(points, epsilon):
+    """Same as _rdp_mask_numpy, written as explicit loops so numba can compile it."""
+    n = points.shape[0]
+    keep = numpy.zeros(n, dtype=numpy.bool_)
+    keep[0] = True
+    keep[n - 1] = True
+    stack = numpy.empty((n, 2), dtype=numpy.int64)
+    stack[0, 0] = 0
+    stack[0, 1] = n - 1
+    top = 1
+    while top > 0:
+        top -= 1
+        first = stack[top, 0]
+        last = stack[top, 1]
+        if last - first < 2:
+            continue
+        ax = numpy.float64(points[first, 0])
+        ay = numpy.float64(points[first, 1])
+        dx = points[last, 0] - ax
+        dy = points[last, 1] - ay
+        seg_len = numpy.sqrt(dx * dx + dy * dy)
+        max_dist = -1.0
+        idx = first
+        for i in range(first + 1, last):
+            px = points[i, 0] - ax
+            py = points[i, 1] - ay
+            if seg_len > 0:
+                dist = abs(dx * py - dy * px) / seg_len
+            else: # Closed curve: the segment is a point, use the distance to it.
+                dist = numpy.sqrt(px * px + py * py)
+            if dist > max_dist:
+                max_dist = dist
+                idx = i
+        if max_dist > epsilon:
+            keep[idx] = True
+            stack[top, 0] = first
+            stack[top, 1] = idx
+            stack[top + 1, 0] = idx
+            stack[top + 1, 1] = last
+            top += 2
+    return keep
+
+def _curve_control_points(curve):
+    """
+    Collects a Potrace curve's segments as cubic Bezier control points.
+
+    Corner segments become two straight lines, each written as a cubic with evenly spaced
+    control points (so it has zero second derivative and is emitted as a single step).
+
+    Returns:
+        numpy.ndarray: (K, 4, 2) float64 array of (p0, c1, c2, p3) per cubic.
+    """
+    cubics = []
+    p0 = curve.start_point
+    for segment in curve.segments:
+        if segment.is_corner:
+            for p3 in (segment.c, segment.end_point):
+                cubics.append((p0, (2 * p0[0] + p3[0]) / 3, (2 * p0[1] + p3[1]) / 3,
+                               (p0[0] + 2 * p3[0]) / 3, (p0[1] + 2 * p3[1]) / 3, p3))
+                p0 = p3
+        else:
+            cubics.append((p0, segment.c1[0], segment.c1[1], segment.c2[0], segment.c2[1], segment.end_point))
+            p0 = segment.end_point
+    control_points = numpy.empty((len(cubics), 4, 2), dtype=numpy.float64)
+    for k, (start, c1x, c1y, c2x, c2y, end) in enumerate(cubics):
+        control_points[k, 0] = start
+        control_points[k, 1] = (c1x, c1y)
+        control_points[k, 2] = (c2x, c2y)
+        control_points[k, 3] = end
+    return control_points
+
+def _curve_anchor_points(curve):
+    """
+    Returns the points known to lie on a Potrace curve without tessellating it.
+
+    These are the start point, each corner point and each segment's end point. Their bounding box
+    is contained in the curve's, so a curve whose anchor points already look like a border is one.
+
+    Returns:
+        numpy.ndarray: (K, 2) float64 array of anchor points.
+    """
+    points = [curve.start_point]
+    for segment in curve.segments:
+        if segment.is_corner:
+            points.append(segment.c)
+        points.append(segment.end_point)
+    return numpy.array(points, dtype=numpy.float64)
+
+def _afd_tesselate_loops(control_points, flatness):
+    """
+    Tessellates cubic Beziers with adaptive forward differencing (Lien, Shantz & Pratt, 1987).
+
+    Each cubic is walked with forward differences; the step is halved while the second difference
+    exceeds `flatness` and doubled while it is below a quarter of it. Steps are powers of two of
+    the parameter range, so every cubic ends exactly on its end point.
+
+    Args:
+        control_points (numpy.ndarray): (K, 4, 2) array of (p0, c1, c2, p3) per cubic, as from _curve_control_points.
+        flatness (float): Maximum second difference (pixels) between consecutive steps.
+
+    Returns:
+        numpy.ndarray: (N, 2) float32 array starting at the first cubic's p0.
+    """
+    max_level = 10 # At most 2**10 steps per cubic.
+    total = 1 << max_level
+    capacity = 16 * control_points.shape[0] + 1
+    out = numpy.empty((capacity, 2), dtype=numpy.float32)
+    out[0, 0] = control_points[0, 0, 0]
+    out[0, 1] = control_points[0, 0, 1]
+    count = 1
+
+    for k in range(control_points.shape[0]):
+        p0x = control_points[k, 0, 0]
+        p0y = control_points[k, 0, 1]
+        # Power basis P(t) = a t^3 + b t^2 + c t + p0.
+        ax = -p0x + 3 * control_points[k, 1, 0] - 3 * control_points[k, 2, 0] + control_points[k, 3, 0]
+        ay = -p0y + 3 * control_points[k, 1, 1] - 3 * control_points[k, 2, 1] + control_points[k, 3, 1]
+        bx = 3 * p0x - 6 * control_points[k, 1, 0] + 3 * control_points[k, 2, 0]
+        by = 3 * p0y - 6 * control_points[k, 1, 1] + 3 * control_points[k, 2, 1]
+        cx = 3 * (control_points[k, 1, 0] - p0x)
+        cy = 3 * (control_points[k, 1, 1] - p0y)
+
+        # Forward differences for a step of h = 1 (the whole cubic).
+        d1x = ax + bx + cx
+        d1y = ay + by + cy
+        d2x = 6 * ax + 2 * bx
+        d2y = 6 * ay + 2 * by
+        d3x = 6 * ax
+        d3y = 6 * ay
+        px = p0x
+        py = p0y
+        step = total
+        pos = 0
+
+        while pos < total:
+            # Too coarse: halve the step.
+            while step > 1 and max(abs(d2x), abs(d2y)) > flatness:
+                d3x /= 8
+                d3y /= 8
+                d2x = d2x / 4 - d3x
+                d2y = d2y / 4 - d3y
+                d1x = (d1x - d2x) / 2
+                d1y = (d1y - d2y) / 2
+                step >>= 1
+            # Too fine: double the step, as long as it stays aligned and inside the cubic.
+            while (step < total and pos % (2 * step) == 0 and pos + 2 * step <= total and
+                   max(abs(d2x), abs(d2y)) < flatness / 4):
+                d1x = 2 * d1x + d2x
+                d1y = 2 * d1y + d2y
+                d2x = 4 * d2x + 4 * d3x
+                d2y = 4 * d2y + 4 * d3y
+                d3x *= 8
+                d3y *= 8
+                step <<= 1
+
+            px += d1x
+            py += d1y
+            d1x += d2x
+            d1y += d2y
+            d2x += d3x
+            d2y += d3y
+            pos += step
+
+            if count == capacity:
+                grown = numpy.empty((2 * capacity, 2), dtype=numpy.float32)
+                grown[:count] = out[:count]
+                out = grown
+                capacity *= 2
+            if pos == total: # Snap to the exact end point to avoid accumulated drift.
+                px = control_points[k, 3, 0]
+                py = control_points[k, 3, 1]
+            out[count, 0] = px
+            out[count, 1] = py
+            count += 1
+
+    return out[:count]
+
+if USE_NUMBA and numba is not None:
+    prange = numba.prange
+    _process_curves = numba.njit(parallel=True, cache=True)(_process_curves_loops)
+    _rdp_mask = numba.njit(cache=True)(_rdp_mask_loops)
+    _afd_tesselate = numba.njit(cache=True)(_afd_tesselate_loops)
+else:
+    prange = range
+    _process_curves = _process_curves_numpy
+    _rdp_mask = _rdp_mask_numpy
+    _afd_tesselate = _afd_tesselate_loops # Correct but slow without numba; prefer 'adaptive' then.
+
+def _trace_image(
+    image_path, threshold, turd_size, opt_tolerance, alphamax,
     skip_border_setting, border_pixel_tol, border_dim_ratio,
-    tesselate_method_config, tesselate_res_config
+    tesselate_method_config, tesselate_res_config, afd_flatness_config
 ):
     """
-    Converts an image file to a list of PyAutoGUI drawing actions.
+    Traces an image file into drawing actions in original image coordinates.
 
-    Args:
-        image_path (str): Path to the input image file.
-        threshold (int): Value (0-255) for image binarization.
-        turd_size (int): Potrace parameter to suppress small speckles.
-        opt_tolerance (float): Potrace parameter for curve optimization.
-        alphamax (float): Potrace parameter for corner detection.
-        scale_factor (float): Factor by which to scale the drawing.
-        skip_border_setting (bool): Whether to attempt skipping image borders.
-        border_pixel_tol (int): Pixel tolerance for border detection.
-        border_dim_ratio (float): Dimension ratio for border detection.
-        tesselate_method_config (str): Tessellation method ('adaptive' or 'regular').
-        tesselate_res_config (int): Resolution for 'regular' tessellation.
+    Takes the same image, Potrace, border and tessellation arguments as image_to_pyautogui_actions.
 
     Returns:
-        list: A list of drawing actions for PyAutoGUI, or an empty list on error.
+        tuple: (action_types, coords); an (N,) uint8 array of ACTION_* codes and an (N, 2) float32
+        array of image coordinates. None on error or if nothing is drawable.
     """
     try:
         pil_img = Image.open(image_path)
     except FileNotFoundError:
         print(f"Error: Image file not found at '{image_path}'")
-        return []
+        return None
     except UnidentifiedImageError:
         print(f"Error: Cannot identify image file. Is it a valid image format (PNG, JPEG, etc.)? Path: '{image_path}'")
-        return []
+        return None
     except Exception as e:
         print(f"Error opening image: {e}")
         traceback.print_exc()
-        return []
+        return None
 
     img_width, img_height = pil_img.width, pil_img.height
     gray_img = pil_img.convert('L')
-    # Create a binary image: 0 for parts darker than threshold (to be traced), 255 for lighter parts.
-    bw_img = gray_img.point(lambda x: 0 if x < threshold else 255, '1')
+    # Create a binary image: False for parts darker than threshold (to be traced), True for lighter parts.
+    # A single vectorized comparison yields the boolean array Potrace wants, without a PIL LUT round-trip.
+    gray_array = numpy.asarray(gray_img, dtype=numpy.uint8)
+    bw_array = gray_array >= threshold
     
     # For debugging the thresholding step, uncomment the next line:
-    # bw_img.save("debug_thresholded_image.png")
-    
-    bw_array = numpy.array(bw_img)
+    # Image.fromarray(bw_array.astype(numpy.uint8) * 255).save("debug_thresholded_image.png")
     
     if USE_SKELETONIZATION:
         # Skeletonize: reduce thick black lines to single-pixel centerlines.
@@ -103,10 +442,12 @@ def image_to_pyautogui_actions(
     else:
         np_image_data = bw_array  # Potrace (pypotrace) expects a NumPy array.
 
-    raw_actions_original_coords = []
-    all_points_for_bbox_calculation = [] # Used for overall centering calculation.
+    action_types = None # (N,) uint8 ACTION_* codes of the points to draw, parallel to coords.
+    coords = None       # (N, 2) float32 original coordinates of the points to draw.
 
     try:
+        # Hand Potrace a C-contiguous boolean buffer so Bitmap construction doesn't need a hidden copy.
+        np_image_data = numpy.ascontiguousarray(np_image_data, dtype=numpy.bool_)
         bitmap = potracelib.Bitmap(np_image_data)
         path_object = bitmap.trace(
             turdsize=turd_size,
@@ -116,90 +457,273 @@ def image_to_pyautogui_actions(
 
         if not path_object or not path_object.curves:
             print("Warning: Potrace did not return any curves for the image.")
-            return []
+            return None
+
+        # Border thresholds only depend on the image size, so compute them once for all curves.
+        img_dims = numpy.array([img_width, img_height], dtype=numpy.float64)
+        border_thresh = img_dims * border_dim_ratio
+        hi_edge = img_dims - border_pixel_tol
+
+        # Resolve the tessellation method once instead of on every curve.
+        if tesselate_method_config == 'regular':
+            tess_method = potracelib.Curve.regular
+            tess_kwargs = {'res': tesselate_res_config}
+        elif tesselate_method_config == 'afd':
+            tess_method = None # Tessellated here from curve.segments instead of by pypotrace.
+            tess_kwargs = {}
+        else:
+            tess_method = potracelib.Curve.adaptive
+            tess_kwargs = {}
 
+        tess_list = []          # Start point + tessellated vertices of each curve, as float32 (k, 2) arrays.
+        tess_curve_indices = [] # Index into path_object.curves of each entry in tess_list.
+        border_curve_indices = [] # Indices of curves skipped as image borders, reported once below.
         for curve_idx, curve in enumerate(path_object.curves):
             if not curve.segments: # Skip curves that have no actual line/curve segments.
                 continue
 
-            current_curve_vertices_list = []
-            if tesselate_method_config == 'regular':
-                tesselated_vertices_np = curve.tesselate(method=potracelib.Curve.regular, res=TESSELATE_RES)
-            else:
-                tesselated_vertices_np = curve.tesselate(method=potracelib.Curve.adaptive)
+            if skip_border_setting:
+                # Reject obvious border curves before paying for tessellation. Anchor points are a subset
+                # of the curve, so this never skips a non-border; the rest are re-checked after tessellation.
+                anchor_points = _curve_anchor_points(curve)
+                if _is_border_bbox(anchor_points.min(axis=0), anchor_points.max(axis=0),
+                                   border_thresh, border_pixel_tol, hi_edge):
+                    border_curve_indices.append(curve_idx)
+                    continue # Skip this curve
 
+            if tess_method is None:
+                tesselated_vertices_np = _afd_tesselate(_curve_control_points(curve), afd_flatness_config)
+            else:
+                tesselated_vertices_np = curve.tesselate(method=tess_method, **tess_kwargs)
 
             if tesselated_vertices_np.size == 0:
                 continue
             
-            for i in range(tesselated_vertices_np.shape[0]):
-                current_curve_vertices_list.append((tesselated_vertices_np[i, 0], tesselated_vertices_np[i, 1]))
+            # Single precision is ample for integer screen coordinates and halves the bytes
+            # touched by every downstream reduction and transform.
+            tess_np = tesselated_vertices_np.astype(numpy.float32, copy=False)
             
             # Need at least 2 points to draw a line.
-            if not current_curve_vertices_list or len(current_curve_vertices_list) < 2:
+            if tess_np.shape[0] < 2:
                 continue
 
-            # Border Detection Logic
-            if skip_border_setting:
-                curve_min_x = min(p[0] for p in current_curve_vertices_list)
-                curve_max_x = max(p[0] for p in current_curve_vertices_list)
-                curve_min_y = min(p[1] for p in current_curve_vertices_list)
-                curve_max_y = max(p[1] for p in current_curve_vertices_list)
-
-                curve_width = curve_max_x - curve_min_x
-                curve_height = curve_max_y - curve_min_y
-
-                spans_almost_full_width = curve_width >= img_width * border_dim_ratio
-                spans_almost_full_height = curve_height >= img_height * border_dim_ratio
-                is_near_left_edge = curve_min_x <= border_pixel_tol
-                is_near_right_edge = curve_max_x >= img_width - border_pixel_tol
-                is_near_top_edge = curve_min_y <= border_pixel_tol
-                is_near_bottom_edge = curve_max_y >= img_height - border_pixel_tol
-                
-                if (spans_almost_full_width and spans_almost_full_height and
-                    is_near_left_edge and is_near_right_edge and
-                    is_near_top_edge and is_near_bottom_edge):
-                    print(f"INFO: Curve {curve_idx} appears to be an image border. Skipping.")
-                    continue # Skip this curve
-
-            # If not a skipped border, add its drawing actions (outline only for this version).
-            curve_actions_buffer = []
-            start_x, start_y = curve.start_point # Potrace provides a start_point for each curve.
-            curve_actions_buffer.append(('moveto', start_x, start_y))
-            
-            current_pen_x, current_pen_y = start_x, start_y
-            # Use the pre-tessellated vertices for drawing this curve's outline.
-            for vx, vy in current_curve_vertices_list:
-                # Avoid tiny redundant moves if tessellation produces very close points.
-                if abs(vx - current_pen_x) > 1e-4 or abs(vy - current_pen_y) > 1e-4 : 
-                    curve_actions_buffer.append(('dragto', vx, vy))
-                    current_pen_x, current_pen_y = vx, vy
-            
-            if curve_actions_buffer: # Only add if actions were actually generated.
-                raw_actions_original_coords.extend(curve_actions_buffer)
-                # Add all points from this valid curve to the bbox calculation.
-                all_points_for_bbox_calculation.extend(p[1:] for p in curve_actions_buffer if len(p) > 1)
+            # Potrace provides a start_point for each curve; the pen moves there first,
+            # then drags through the pre-tessellated vertices to draw this curve's outline.
+            tess_list.append(numpy.vstack((numpy.asarray(curve.start_point, dtype=numpy.float32), tess_np)))
+            tess_curve_indices.append(curve_idx)
+
+        if tess_list:
+            # Curves are independent, so border detection and redundant-point filtering
+            # run over all of them in one pass on a single packed array.
+            all_coords = numpy.concatenate(tess_list, axis=0)
+            offsets = numpy.zeros(len(tess_list) + 1, dtype=numpy.int64)
+            numpy.cumsum([t.shape[0] for t in tess_list], out=offsets[1:])
+            keep, is_border = _process_curves(
+                all_coords, offsets, skip_border_setting, border_thresh, float(border_pixel_tol), hi_edge, 1e-4
+            )
+
+            border_curve_indices.extend(tess_curve_indices[i] for i in numpy.flatnonzero(is_border))
+
+            # Each curve starts with a 'moveto' and drags through the rest of its points (outline only
+            # for this version). One mask over the packed array selects the points of non-border
+            # curves, so the drawable actions come out without any per-curve copies.
+            all_types = numpy.full(all_coords.shape[0], ACTION_DRAGTO, dtype=numpy.uint8)
+            all_types[offsets[:-1]] = ACTION_MOVETO
+            drawn = keep & ~numpy.repeat(is_border, numpy.diff(offsets))
+            if drawn.any():
+                action_types = all_types[drawn]
+                coords = all_coords[drawn]
+
+        for curve_idx in sorted(border_curve_indices):
+            print(f"INFO: Curve {curve_idx} appears to be an image border. Skipping.")
 
     except AttributeError as e:
         print(f"AttributeError during Potrace processing: {e}\\n"
               "This might be a linter warning if pypotrace is installed but its C components confuse the linter.\\n"
               "Ensure 'pypotrace' (often installed via pip as 'potrace') is correctly in your Python environment.")
         traceback.print_exc()
-        return []
+        return None
     except Exception as e:
         print(f"An unexpected error occurred during Potrace processing: {e}")
         traceback.print_exc()
-        return []
+        return None
 
-    if not all_points_for_bbox_calculation:
+    if coords is None:
         print("No points for drawing were generated (or all were skipped as borders/empty).")
+        return None
+
+    return action_types, coords
+
+
+@functools.lru_cache(maxsize=8)
+def _load_or_trace_image(image_path, image_mtime_ns, *trace_args):
+    """
+    Returns _trace_image(image_path, *trace_args), memoized in-process and in TRACE_CACHE_DIR.
+
+    image_mtime_ns is part of the key, so editing the image invalidates its cached trace.
+    """
+    if TRACE_CACHE_DIR is None:
+        return _trace_image(image_path, *trace_args)
+
+    cache_key = hashlib.sha256(
+        repr((TRACE_CACHE_VERSION, os.path.abspath(image_path), image_mtime_ns, USE_SKELETONIZATION, trace_args)).encode()
+    ).hexdigest()
+    cache_path = os.path.join(TRACE_CACHE_DIR, f"{cache_key}.npz")
+
+    if os.path.isfile(cache_path):
+        try:
+            with numpy.load(cache_path) as cached:
+                print(f"Using cached trace: {cache_path}")
+                return cached['action_types'], cached['coords']
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Warning: Ignoring unreadable trace cache file '{cache_path}': {e}")
+            try:
+                os.remove(cache_path) # Drop it so the fresh trace below can replace it.
+            except OSError:
+                pass
+
+    traced = _trace_image(image_path, *trace_args)
+    if traced is not None:
+        tmp_path = None
+        try:
+            os.makedirs(TRACE_CACHE_DIR, exist_ok=True)
+            # A unique temp file per writer, so concurrent runs never write to the same file.
+            with tempfile.NamedTemporaryFile(dir=TRACE_CACHE_DIR, suffix='.npz.tmp', delete=False) as f:
+                tmp_path = f.name
+                numpy.savez_compressed(f, action_types=traced[0], coords=traced[1])
+            os.replace(tmp_path, cache_path) # Never leave a half-written cache file behind.
+        except OSError as e:
+            print(f"Warning: Could not write trace cache file '{cache_path}': {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return traced
+
+def _reorder_curves(action_types, coords):
+    """
+    Reorders curves, and picks where each one is entered, so each starts near where the previous one ended.
+
+    Greedy nearest neighbour: starting from the first curve, repeatedly pick the unvisited curve with
+    an entry point closest to the current pen position. Potrace curves are closed (start == end), so
+    any vertex can be the entry point: the curve is rotated to start and end there. Open polylines
+    can only be entered at an end, and are reversed when their end point is the closer one.
+    This cuts the pen travel between curves; the drawn shapes are unchanged.
+
+    Args:
+        action_types (numpy.ndarray): (N,) uint8 ACTION_* codes; each curve starts with ACTION_MOVETO.
+        coords (numpy.ndarray): (N, 2) coordinates, parallel to action_types.
+
+    Returns:
+        tuple: (action_types, coords) in the new drawing order.
+    """
+    starts = numpy.flatnonzero(action_types == ACTION_MOVETO)
+    stops = numpy.append(starts[1:], action_types.shape[0])
+    if starts.shape[0] < 2:
+        return action_types, coords
+
+    points = coords.astype(numpy.float64)
+    curve_of_point = numpy.repeat(numpy.arange(starts.shape[0]), stops - starts)
+    is_closed = (numpy.abs(points[starts] - points[stops - 1]).max(axis=1) <= 1e-4) & (stops - starts > 2)
+
+    # Points the pen may enter an unvisited curve at: every vertex of a closed curve except its
+    # duplicated closing point, and both end points of an open one.
+    is_entry = is_closed[curve_of_point]
+    is_entry[stops[is_closed] - 1] = False
+    is_entry[starts[~is_closed]] = True
+    is_entry[stops[~is_closed] - 1] = True
+
+    is_entry[starts[0]:stops[0]] = False
+    pen = points[stops[0] - 1]
+    point_order = [numpy.arange(starts[0], stops[0])]
+    new_starts = [0]
+    for _ in range(starts.shape[0] - 1):
+        dists = numpy.hypot(*(points - pen).T)
+        dists[~is_entry] = numpy.inf
+        entry = int(dists.argmin())
+        c = curve_of_point[entry]
+        start, stop = starts[c], stops[c]
+
+        new_starts.append(new_starts[-1] + point_order[-1].shape[0])
+        if is_closed[c]: # Rotate: entry -> ... -> closing point's twin (start) -> ... -> entry again.
+            point_order.append(numpy.concatenate((numpy.arange(entry, stop - 1), numpy.arange(start, entry + 1))))
+            pen = points[entry]
+        elif entry == stop - 1: # Cheaper to draw this open curve backwards.
+            point_order.append(numpy.arange(stop - 1, start - 1, -1))
+            pen = points[start]
+        else:
+            point_order.append(numpy.arange(start, stop))
+            pen = points[stop - 1]
+        is_entry[start:stop] = False
+
+    # Curves are only permuted/rotated/reversed: each still starts with a 'moveto' and drags through the rest.
+    new_types = numpy.full(action_types.shape[0], ACTION_DRAGTO, dtype=numpy.uint8)
+    new_types[new_starts] = ACTION_MOVETO
+    return new_types, coords[numpy.concatenate(point_order)]
+
+def image_to_pyautogui_actions(
+    image_path, threshold, turd_size, opt_tolerance, alphamax, scale_factor,
+    skip_border_setting, border_pixel_tol, border_dim_ratio,
+    tesselate_method_config, tesselate_res_config, afd_flatness_config, simplify_epsilon_px,
+    reorder_curves_setting
+):
+    """
+    Converts an image file to a list of PyAutoGUI drawing actions.
+
+    Args:
+        image_path (str): Path to the input image file.
+        threshold (int): Value (0-255) for image binarization.
+        turd_size (int): Potrace parameter to suppress small speckles.
+        opt_tolerance (float): Potrace parameter for curve optimization.
+        alphamax (float): Potrace parameter for corner detection.
+        scale_factor (float): Factor by which to scale the drawing.
+        skip_border_setting (bool): Whether to attempt skipping image borders.
+        border_pixel_tol (int): Pixel tolerance for border detection.
+        border_dim_ratio (float): Dimension ratio for border detection.
+        tesselate_method_config (str): Tessellation method ('adaptive', 'regular' or 'afd').
+        tesselate_res_config (int): Resolution for 'regular' tessellation.
+        afd_flatness_config (float): Flatness tolerance (pixels) for 'afd' tessellation.
+        simplify_epsilon_px (float): Ramer-Douglas-Peucker tolerance in screen pixels (0 disables).
+        reorder_curves_setting (bool): Whether to reorder curves to shorten pen travel between them.
+
+    Returns:
+        list: A list of drawing actions for PyAutoGUI, or an empty list on error.
+    """
+    try:
+        image_mtime_ns = os.stat(image_path).st_mtime_ns
+    except FileNotFoundError:
+        print(f"Error: Image file not found at '{image_path}'")
+        return []
+
+    # Tracing only depends on the image and the trace settings, so it is cached; scaling,
+    # simplification and screen placement below are applied to the cached result each time.
+    traced = _load_or_trace_image(
+        image_path, image_mtime_ns, threshold, turd_size, opt_tolerance, alphamax,
+        skip_border_setting, border_pixel_tol, border_dim_ratio,
+        tesselate_method_config, tesselate_res_config, afd_flatness_config
+    )
+    if traced is None:
         return []
+    action_types, coords = traced
+
+    # The tolerance is given in screen pixels; convert it to image pixels.
+    rdp_epsilon = simplify_epsilon_px / scale_factor
+    if rdp_epsilon > 0:
+        # Each curve starts at a 'moveto'; simplify curves independently.
+        curve_bounds = numpy.append(numpy.flatnonzero(action_types == ACTION_MOVETO), action_types.shape[0])
+        keep = numpy.ones(action_types.shape[0], dtype=numpy.bool_)
+        for start, stop in zip(curve_bounds[:-1], curve_bounds[1:]):
+            if stop - start >= 8:
+                keep[start:stop] = _rdp_mask(coords[start:stop], rdp_epsilon)
+        action_types = action_types[keep]
+        coords = coords[keep]
+
+    if reorder_curves_setting:
+        action_types, coords = _reorder_curves(action_types, coords)
 
     # --- Calculate Bounding Box of all points to be drawn for centering and scaling ---
-    min_x_orig = min(p[0] for p in all_points_for_bbox_calculation)
-    max_x_orig = max(p[0] for p in all_points_for_bbox_calculation)
-    min_y_orig = min(p[1] for p in all_points_for_bbox_calculation)
-    max_y_orig = max(p[1] for p in all_points_for_bbox_calculation)
+    mins = coords.min(axis=0)
+    maxs = coords.max(axis=0)
+    min_x_orig, min_y_orig = mins
+    max_x_orig, max_y_orig = maxs
 
     original_drawing_width = max_x_orig - min_x_orig
     original_drawing_height = max_y_orig - min_y_orig
@@ -219,22 +743,18 @@ def image_to_pyautogui_actions(
     screen_offset_x = (screen_width - scaled_drawing_width) / 2.0
     screen_offset_y = (screen_height - scaled_drawing_height) / 2.0
     
-    final_actions = []
-    for action_type, x_orig, y_orig in raw_actions_original_coords:
-        # 1. Normalize original point relative to its own drawing's bounding box (so 0,0 is top-left of drawing).
-        norm_x = x_orig - min_x_orig if original_drawing_width > 1e-3 else 0
-        norm_y = y_orig - min_y_orig if original_drawing_height > 1e-3 else 0
-        
-        # 2. Scale the normalized point.
-        scaled_x = norm_x * scale_factor
-        scaled_y = norm_y * scale_factor
-
-        # 3. Add the screen offset to position the scaled drawing correctly on the screen.
-        final_x = int(round(scaled_x + screen_offset_x))
-        final_y = int(round(scaled_y + screen_offset_y))
-        
-        final_actions.append((action_type, final_x, final_y))
-        
+    # Normalize every point relative to the drawing's bounding box (so 0,0 is top-left of drawing),
+    # scale it, then add the screen offset. The steps run in place on a single float32 buffer,
+    # so the transform allocates only that buffer and the int32 result.
+    # numpy.rint rounds half to even, matching Python's round().
+    screen_offsets = numpy.array([screen_offset_x, screen_offset_y], dtype=numpy.float32)
+    transformed = numpy.subtract(coords, mins, dtype=numpy.float32)
+    transformed *= numpy.float32(scale_factor)
+    transformed += screen_offsets
+    numpy.rint(transformed, out=transformed)
+    final_xy = transformed.astype(numpy.int32)
+
+    final_actions = list(zip(ACTION_NAMES[action_types].tolist(), final_xy[:, 0].tolist(), final_xy[:, 1].tolist()))
     return final_actions
 
 def draw_with_pyautogui(actions, start_delay, action_pause):
@@ -250,9 +770,12 @@ def draw_with_pyautogui(actions, start_delay, action_pause):
     if ATTEMPT_TO_SKIP_IMAGE_BORDER: 
         print("Border skipping: ON.")
     
-    tess_res_info = TESSELATE_RES if TESSELATE_METHOD == 'regular' else 'N/A (adaptive method)'
     print(f"Potrace settings: turdsize={POTRACE_TURDSIZE}, opttolerance={POTRACE_OPTTOLERANCE}, alphamax={POTRACE_ALPHAMAX}")
-    print(f"Tessellation: method='{TESSELATE_METHOD}', resolution (if regular)='{tess_res_info}'")
+    if TESSELATE_METHOD == 'afd':
+        print(f"Tessellation: method='{TESSELATE_METHOD}', flatness tolerance='{AFD_FLATNESS}'")
+    else:
+        tess_res_info = TESSELATE_RES if TESSELATE_METHOD == 'regular' else 'N/A (adaptive method)'
+        print(f"Tessellation: method='{TESSELATE_METHOD}', resolution (if regular)='{tess_res_info}'")
     print("To cancel countdown in terminal: Ctrl+C.")
     print("To cancel drawing once started: quickly move mouse to any screen corner.")
     
@@ -269,18 +792,37 @@ def draw_with_pyautogui(actions, start_delay, action_pause):
     pyautogui.PAUSE = action_pause          # Set our desired pause for drawing actions.
     pyautogui.FAILSAFE = True               # Enable PyAutoGUI's built-in failsafe.
 
+    # Each 'moveto' starts a stroke; the following run of 'dragto' actions is drawn with the button
+    # held down once, dragging without the per-call pause. Only strokes pay action_pause.
+    # dragTo (rather than moveTo) is used so every point is sent as a real drag event: on macOS a
+    # plain move with the button held isn't seen as drawing by most canvases.
+    pen_down = False
+
     try:
         for action_type, x, y in actions:
-            if action_type == 'moveto':
+            if action_type == 'dragto':
+                if not pen_down:
+                    pyautogui.mouseDown(button='left')
+                    pen_down = True
+                pyautogui.dragTo(x, y, button='left', mouseDownUp=False, _pause=False)
+            else:
+                if pen_down:
+                    pyautogui.mouseUp(button='left')
+                    pen_down = False
                 pyautogui.moveTo(x, y)
-            elif action_type == 'dragto':
-                pyautogui.dragTo(x, y, button='left')
     except pyautogui.FailSafeException:
         print("\nDrawing cancelled by user (mouse moved to screen corner).")
     except Exception as e:
         print(f"\nAn error occurred during PyAutoGUI drawing: {e}")
         traceback.print_exc()
     finally:
+        if pen_down:
+            # Release the button even if the failsafe fired with the mouse still in a corner.
+            pyautogui.FAILSAFE = False
+            try:
+                pyautogui.mouseUp(button='left', _pause=False)
+            finally:
+                pyautogui.FAILSAFE = True
         pyautogui.PAUSE = original_pause_setting # Restore original PyAutoGUI pause.
         print("\nDrawing attempt finished or cancelled.")
 
@@ -310,7 +852,10 @@ if __name__ == "__main__":
             border_pixel_tol=BORDER_DETECTION_PIXEL_TOLERANCE,
             border_dim_ratio=BORDER_DETECTION_DIMENSION_MATCH_RATIO,
             tesselate_method_config=TESSELATE_METHOD, # Pass configured method
-            tesselate_res_config=TESSELATE_RES        # Pass configured resolution
+            tesselate_res_config=TESSELATE_RES,       # Pass configured resolution
+            afd_flatness_config=AFD_FLATNESS,
+            simplify_epsilon_px=SIMPLIFY_EPSILON_PX,
+            reorder_curves_setting=REORDER_CURVES
         )
 
         if generated_actions: